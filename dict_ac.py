@@ -1,15 +1,77 @@
 # dict_final_v20_no_mapping.py — Remove Acronym Mapping, Keep Lowercase + Standalone Acronyms
 
 import os
-import pandas as pd
+import csv
 import fitz  # PyMuPDF
 import re
 import time
 import stat
+from collections import Counter
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from nltk.corpus import stopwords
 import nltk
+from heading_patterns import compile_heading_candidate_re
 
-nltk.download('stopwords')
+try:
+    import re2  # google-re2: linear-time engine for the tokenizer, optional
+except ImportError:
+    re2 = None
+
+# ProcessPoolExecutor rejects more than 61 workers on Windows
+_MAX_WORKERS = 61
+
+# Text extraction flags: PyMuPDF's "text" defaults, except that ligatures
+# are expanded ("ﬁ" → "fi"), odd whitespace is mapped to spaces and words
+# hyphenated across line breaks are rejoined, so none of that survives into
+# the Python tokenizer. Everything else in the defaults (e.g. character codes
+# for glyphs without a Unicode mapping) is kept.
+_TEXT_FLAGS = (
+    fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES & ~fitz.TEXT_PRESERVE_WHITESPACE
+) | fitz.TEXT_DEHYPHENATE
+
+# Tokenizer: parentheticals are matched (and skipped) in the same pass that
+# emits words, so group 1 is empty for anything inside parentheses.
+if re2 is not None:
+    # RE2 has no Unicode-aware \b, so consume whole word runs that contain
+    # anything other than ASCII letters; tokens come out the same as below.
+    _TOKEN_RE = re2.compile(
+        r'\([^)\n]*\)|[\pL\pN_]*(?:[\pN_]|[^\PLa-zA-Z])[\pL\pN_]*|([a-zA-Z]{2,})'
+    )
+else:
+    _TOKEN_RE = re.compile(r'\([^)\n]*\)|\b([a-zA-Z]{2,})\b')
+_HEADING_KEYWORDS = (
+    'chapter', 'section', 'part', 'article', 'annexure',
+    'appendix', 'volume', 'abstract', 'introduction',
+    'conclusion', 'summary', 'references', 'index', 'contents'
+)
+# Line starts with a heading keyword (plain prefix, ASCII case-insensitive,
+# same as lower().startswith) or with numbering such as "1.", "2.3" or "IV."
+_HEADING_PREFIX_RE = re.compile(
+    r'(?ai:' + '|'.join(_HEADING_KEYWORDS) + r')'
+    r'|(?:\d+\.|\d+\.\d+|[IVXLCDM]+\.)\s+'
+)
+# Lines that could satisfy some is_heading rule: up to 12 words (rules 1, 2),
+# a keyword, digit or Roman-numeral start (rules 3, 5) or a trailing colon (rule 4)
+_HEADING_CANDIDATE_RE = compile_heading_candidate_re(_HEADING_KEYWORDS, 12)
+_ROMAN_RE = re.compile(
+    r'^(?=[MDCLXVI])M{0,3}(CM|CD|D?C{0,3})'
+    r'(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})$', re.IGNORECASE
+)
+# Longest string _ROMAN_RE can match: MMMDCCCLXXXVIII
+_MAX_ROMAN_LEN = 15
+# Acronym shape for [A-Za-z]{2,} tokens: two consecutive capitals anywhere,
+# or at least two capitals in a word of at most 6 letters
+_ACRONYM_SHAPE_RE = re.compile(r'[A-Z]{2}|\A(?=[A-Za-z]{2,6}\Z)[a-z]*[A-Z][a-z]*[A-Z]')
+
+# Common mixed-case acronyms
+_KNOWN_MIXED_ACRONYMS = frozenset({
+    'phd', 'mba', 'latex', 'mysql', 'postgresql', 'javascript',
+    'iphone', 'ipad', 'ipod', 'macbook', 'ios', 'macos',
+    'ebay', 'etsy', 'paypal', 'linkedin', 'youtube',
+    'mphil', 'btech', 'mtech'
+})
 
 
 def safe_delete(file_path, retries=5, delay=1):
@@ -29,44 +91,113 @@ def safe_delete(file_path, retries=5, delay=1):
             break
 
 
+_STOP_WORDS = None
+
+
+def _ensure_stopwords():
+    """Load NLTK's English stopwords once per process, downloading only if missing."""
+    global _STOP_WORDS
+    if _STOP_WORDS is None:
+        try:
+            words = stopwords.words('english')
+        except LookupError:
+            nltk.download('stopwords', quiet=True)
+            words = stopwords.words('english')
+        _STOP_WORDS = frozenset(words)
+    return _STOP_WORDS
+
+
+def write_counts_csv(csv_path, header, counts):
+    """
+    Write (key, count) rows sorted by key straight from the counter.
+    Rows end in os.linesep, as pandas' to_csv wrote them.
+    """
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(header)
+        writer.writerows(sorted(counts.items()))
+
+
+def _is_acronym_word(word, kind):
+    """Enhanced acronym detection; kind is the word's word_kinds entry"""
+    if kind == 'acronym':
+        return True
+
+    # All caps, 2+ capitals in a short word, or consecutive capitals
+    return _ACRONYM_SHAPE_RE.search(word) is not None
+
+
+# Pure string classifiers, cached at module level so the caches don't pin
+# a processor instance. Corpus text repeats words and heading lines a lot.
+@lru_cache(maxsize=100_000)
+def _is_roman(word):
+    return _ROMAN_RE.match(word) is not None
+
+
+@lru_cache(maxsize=100_000)
+def _is_heading_line(text_line):
+    """Pattern-based heading detection"""
+    text_line = text_line.strip()
+    if not text_line:
+        return False
+
+    # Cheapest rules first: they need neither a full scan nor a split
+
+    # Rule 4: Ends with colon
+    if text_line.endswith(':'):
+        return True
+
+    # Rules 3 + 5: Starts with a heading keyword or with numbering
+    if _HEADING_PREFIX_RE.match(text_line):
+        return True
+
+    # Rules 1 and 2 only apply to lines of up to 12 words, so body text
+    # is rejected without splitting the whole line
+    words = text_line.split(None, 12)
+    if len(words) > 12:
+        return False
+
+    # Rule 1: All caps line
+    if text_line.isupper():
+        return True
+
+    # Rule 2: Short line with mostly capitals (2-6 words)
+    if 2 <= len(words) <= 6:
+        title_words = sum(1 for w in words if w[0].isupper())
+        if title_words / len(words) >= 0.7:
+            return True
+
+    return False
+
+
 class NavalDocumentProcessor:
     def __init__(self, input_folder, output_folder="output_no_mapping"):
         self.input_folder = input_folder
         self.output_folder = output_folder
         os.makedirs(self.output_folder, exist_ok=True)
 
-        self.stop_words = set(stopwords.words('english'))
+        self.stop_words = _ensure_stopwords()
+        # One lookup on the lowercased word answers both "stopword?" and
+        # "known mixed-case acronym?" (stopwords win, as before). No key is
+        # longer than max_word_kind_len, so longer words skip .lower() + lookup.
+        self.word_kinds = dict.fromkeys(_KNOWN_MIXED_ACRONYMS, 'acronym')
+        self.word_kinds.update(dict.fromkeys(self.stop_words, 'stopword'))
+        self.max_word_kind_len = max(map(len, self.word_kinds))
 
         # TWO CSV files (removed mapping file)
         self.lowercase_csv = os.path.join(self.output_folder, "lowercase_words_alphabetical.csv")
         self.standalone_acronyms_csv = os.path.join(self.output_folder, "standalone_acronyms_alphabetical.csv")
         self.log_file = os.path.join(self.output_folder, "processing_log.txt")
+        self._log_fh = None  # kept open for the duration of process_all_documents
+        
+        # CSVs are rewritten once at the end of a run, plus every N PDFs for crash safety
+        self.checkpoint_every = 20
 
         self.naval_words = self._initialize_naval_vocabulary()
         
         # Track seen words (removed mapping storage)
-        self.lowercase_seen = {}
-        self.standalone_acronyms_seen = {}
-
-        self.roman_pattern = re.compile(
-            r'^(?=[MDCLXVI])M{0,3}(CM|CD|D?C{0,3})'
-            r'(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})$', re.IGNORECASE
-        )
-        
-        # Common mixed-case acronyms
-        self.known_mixed_acronyms = {
-            'phd', 'mba', 'latex', 'mysql', 'postgresql', 'javascript',
-            'iphone', 'ipad', 'ipod', 'macbook', 'ios', 'macos',
-            'ebay', 'etsy', 'paypal', 'linkedin', 'youtube',
-            'mphil', 'btech', 'mtech'
-        }
-        
-        # Heading keywords
-        self.heading_keywords = [
-            'chapter', 'section', 'part', 'article', 'annexure', 
-            'appendix', 'volume', 'abstract', 'introduction', 
-            'conclusion', 'summary', 'references', 'index', 'contents'
-        ]
+        self.lowercase_seen = Counter()
+        self.standalone_acronyms_seen = Counter()
 
     def _initialize_naval_vocabulary(self):
         naval_terms = {
@@ -130,65 +261,10 @@ class NavalDocumentProcessor:
         return naval_terms
 
     def _is_acronym(self, word):
-        """Enhanced acronym detection"""
-        if word.lower() in self.known_mixed_acronyms:
-            return True
-        
-        if word.isupper() and len(word) >= 2:
-            return True
-        
-        upper_count = sum(1 for c in word if c.isupper())
-        
-        if upper_count >= 2 and len(word) <= 6:
-            return True
-        
-        if len(word) >= 3 and upper_count >= 2:
-            has_consecutive_caps = False
-            for i in range(len(word) - 1):
-                if word[i].isupper() and word[i+1].isupper():
-                    has_consecutive_caps = True
-                    break
-            if has_consecutive_caps:
-                return True
-        
-        return False
+        return _is_acronym_word(word, self.word_kinds.get(word.lower()))
 
     def is_heading(self, text_line):
-        """Pattern-based heading detection"""
-        if not text_line or len(text_line.strip()) == 0:
-            return False
-        
-        text_line = text_line.strip()
-        words = text_line.split()
-        
-        if len(words) == 0:
-            return False
-        
-        # Rule 1: All caps line
-        if text_line.isupper() and len(words) <= 12:
-            return True
-        
-        # Rule 2: Short line with mostly capitals (2-6 words)
-        if 2 <= len(words) <= 6:
-            title_words = sum(1 for w in words if w and len(w) > 0 and w[0].isupper())
-            if title_words / len(words) >= 0.7:
-                return True
-        
-        # Rule 3: Contains heading keywords
-        text_lower = text_line.lower()
-        for keyword in self.heading_keywords:
-            if text_lower.startswith(keyword):
-                return True
-        
-        # Rule 4: Ends with colon
-        if text_line.endswith(':'):
-            return True
-        
-        # Rule 5: Starts with numbering
-        if re.match(r'^(\d+\.|\d+\.\d+|[IVXLCDM]+\.)\s+', text_line):
-            return True
-        
-        return False
+        return _is_heading_line(text_line)
 
     def extract_text_from_pdf(self, pdf_path):
         """Extract text for digitalized documents"""
@@ -196,154 +272,163 @@ class NavalDocumentProcessor:
             doc = fitz.open(pdf_path)
             num_pages = len(doc)
             
-            all_lines = []
-            
-            for page_num in range(num_pages):
-                page = doc.load_page(page_num)
-                text = page.get_text("text")
-                
-                lines = text.split('\n')
-                
-                for line in lines:
-                    line = line.strip()
-                    if line:
-                        all_lines.append(line)
-            
+            # Pages are read one after another: a fitz.Document is not
+            # thread-safe, and PDFs already run in separate worker processes.
+            page_texts = (page.get_text("text", flags=_TEXT_FLAGS) for page in doc)
+            text = "\n".join(t for t in page_texts if t)
             doc.close()
-            return all_lines, num_pages
+            return text, num_pages
             
         except Exception as e:
             print(f"Error extracting text: {e}")
-            return [], 0
+            return "", 0
 
-    def extract_words_from_text(self, lines):
+    def extract_words_from_text(self, text):
         """
         Extract words and standalone acronyms (NO mapping extraction):
-        - Remove parenthetical content entirely
-        - Standalone acronyms → Add to standalone_acronyms file
-        - Regular words → Add to lowercase file
+        - Remove heading lines and parenthetical content entirely
+        - Standalone acronyms → counted for the standalone_acronyms file
+        - Regular words → counted (lowercased) for the lowercase file
+        Returns (lowercase_counts, acronym_counts).
         """
         
         heading_lines_skipped = 0
-        lowercase_words = []
         
-        for line in lines:
-            if self.is_heading(line):
+        def drop_heading(match):
+            nonlocal heading_lines_skipped
+            if _is_heading_line(match.group()):
                 heading_lines_skipped += 1
+                return ''
+            return match.group()
+        
+        # Headings are cut out of the document buffer in place; the tokenizer
+        # then scans it in one go. Parentheticals cannot span lines.
+        text = _HEADING_CANDIDATE_RE.sub(drop_heading, text)
+        
+        # Count raw tokens in C first, then classify each distinct token once:
+        # the Python-level rules below run per vocabulary entry, not per occurrence.
+        token_counts = Counter(_TOKEN_RE.findall(text))
+        token_counts.pop('', None)  # parentheticals
+        
+        word_kinds = self.word_kinds
+        max_kind_len = self.max_word_kind_len
+        lowercase_counts = Counter()
+        acronym_counts = Counter()
+        for word, count in token_counts.items():
+            if len(word) <= _MAX_ROMAN_LEN and _is_roman(word):
                 continue
-            
-            # Remove ALL parenthetical content (including acronyms and their definitions)
-            cleaned_line = re.sub(r'\s*\([^)]*\)', '', line)
-            
-            # Extract words
-            words = re.findall(r'\b[a-zA-Z]{2,}\b', cleaned_line)
-            
-            for word in words:
-                if not word.isalpha() or not word.isascii() or self.roman_pattern.match(word):
-                    continue
-                
-                if word.lower() in self.stop_words:
-                    continue
-                
-                # Check if it's an acronym
-                if self._is_acronym(word):
-                    # Track standalone acronym
-                    if word not in self.standalone_acronyms_seen:
-                        self.standalone_acronyms_seen[word] = 0
-                    self.standalone_acronyms_seen[word] += 1
-                else:
-                    # Regular word → lowercase
-                    lowercase_words.append(word.lower())
+            kind = word_kinds.get(word.lower()) if len(word) <= max_kind_len else None
+            if kind == 'stopword':
+                continue
+            if _is_acronym_word(word, kind):
+                acronym_counts[word] = count
+            else:
+                lowercase_counts[word.lower()] += count
         
         print(f"✓ Skipped {heading_lines_skipped} heading lines")
-        print(f"✓ Found {len(self.standalone_acronyms_seen)} unique standalone acronyms")
+        print(f"✓ Found {len(acronym_counts)} unique standalone acronyms")
         
-        return lowercase_words
-
-    def update_word_data(self, lowercase_words):
-        """Only track lowercase words"""
-        for word in lowercase_words:
-            if word not in self.lowercase_seen:
-                self.lowercase_seen[word] = 0
-            self.lowercase_seen[word] += 1
+        return lowercase_counts, acronym_counts
 
     def save_to_csv(self):
         # 1. Save lowercase words ALPHABETICALLY
-        lowercase_list = []
-        for word in sorted(self.lowercase_seen.keys()):
-            lowercase_list.append({
-                'word': word, 
-                'frequency': self.lowercase_seen[word]
-            })
-        pd.DataFrame(lowercase_list).to_csv(self.lowercase_csv, index=False)
+        write_counts_csv(self.lowercase_csv, ('word', 'frequency'), self.lowercase_seen)
         
         # 2. Save standalone acronyms ALPHABETICALLY
-        standalone_list = []
-        for acronym in sorted(self.standalone_acronyms_seen.keys()):
-            standalone_list.append({
-                'acronym': acronym,
-                'frequency': self.standalone_acronyms_seen[acronym]
-            })
-        pd.DataFrame(standalone_list).to_csv(self.standalone_acronyms_csv, index=False)
+        write_counts_csv(self.standalone_acronyms_csv, ('acronym', 'frequency'), self.standalone_acronyms_seen)
 
     def log_document_results(self, doc_name, pages, lowercase_count, standalone_count):
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(f"\n{'='*60}\n")
-            f.write(f"Document: {doc_name}\n")
-            f.write(f"Processing Time: {pd.Timestamp.now()}\n")
-            f.write(f"Pages: {pages}\n")
-            f.write(f"Lowercase Words: {lowercase_count}\n")
-            f.write(f"Standalone Acronyms: {standalone_count}\n")
-            f.write(f"{'='*60}\n")
+        record = (
+            f"\n{'='*60}\n"
+            f"Document: {doc_name}\n"
+            f"Processing Time: {datetime.now()}\n"
+            f"Pages: {pages}\n"
+            f"Lowercase Words: {lowercase_count}\n"
+            f"Standalone Acronyms: {standalone_count}\n"
+            f"{'='*60}\n"
+        )
+        if self._log_fh is not None:
+            self._log_fh.write(record)
+        else:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(record)
 
     def process_pdf(self, pdf_path):
+        """
+        Extract and count the words of one PDF without touching shared state,
+        so it can run in a worker process. Merging is left to the caller.
+        Returns (lowercase_counts, acronym_counts, num_pages), or None if no text.
+        """
         pdf_name = os.path.basename(pdf_path)
         print(f"\n{'='*60}")
         print(f"Processing: {pdf_name}")
         print(f"{'='*60}")
         
-        lines, num_pages = self.extract_text_from_pdf(pdf_path)
+        text, num_pages = self.extract_text_from_pdf(pdf_path)
         
-        if not lines:
+        if not text or text.isspace():
             print(f"✗ No text extracted from {pdf_name}")
-            return
+            return None
         
         print(f"✓ Extracted text from {num_pages} pages")
         
-        lowercase_words = self.extract_words_from_text(lines)
+        lowercase_counts, acronym_counts = self.extract_words_from_text(text)
+        
+        return lowercase_counts, acronym_counts, num_pages
+
+    def merge_pdf_counts(self, pdf_path, counts):
+        """
+        Merge one PDF's counts into the totals and log it (parent process only).
+        Returns True if the PDF was merged and can be deleted once saved.
+        """
+        if counts is None:
+            return False
+        
+        pdf_name = os.path.basename(pdf_path)
+        lowercase_counts, acronym_counts, num_pages = counts
         
-        if not lowercase_words and not self.standalone_acronyms_seen:
+        if not lowercase_counts and not acronym_counts:
             print(f"✗ No valid words found in {pdf_name}")
-            return
+            return False
         
-        self.update_word_data(lowercase_words)
-        self.save_to_csv()
+        self.lowercase_seen += lowercase_counts
+        self.standalone_acronyms_seen += acronym_counts
         
         print(f"\n{'='*60}")
         print(f"FINAL RESULTS FOR: {pdf_name}")
         print(f"{'='*60}")
         print(f"Pages: {num_pages}")
-        print(f"Lowercase Words Extracted: {len(lowercase_words)}")
+        print(f"Lowercase Words Extracted: {sum(lowercase_counts.values())}")
         print(f"Total Unique Lowercase: {len(self.lowercase_seen)}")
         print(f"Total Standalone Acronyms: {len(self.standalone_acronyms_seen)}")
         
-        self.log_document_results(pdf_name, num_pages, len(lowercase_words), len(self.standalone_acronyms_seen))
-        
-        try:
-            safe_delete(pdf_path)
-        except Exception as e:
-            print(f"✗ Error deleting document: {e}")
+        self.log_document_results(pdf_name, num_pages, sum(lowercase_counts.values()), len(self.standalone_acronyms_seen))
         print(f"{'='*60}\n")
+        return True
+
+    def checkpoint(self, merged_paths):
+        """Save the CSVs, then delete the PDFs whose counts are now on disk"""
+        self.save_to_csv()
+        if self._log_fh is not None:
+            self._log_fh.flush()
+        for pdf_path in merged_paths:
+            try:
+                safe_delete(pdf_path)
+            except Exception as e:
+                print(f"✗ Error deleting document: {e}")
+        merged_paths.clear()
 
     def process_all_documents(self):
         pdf_extension = '.pdf'
         try:
-            all_files = [
-                os.path.join(self.input_folder, f)
-                for f in os.listdir(self.input_folder)
-                if os.path.isfile(os.path.join(self.input_folder, f)) and
-                os.path.splitext(f)[1].lower() == pdf_extension
-            ]
+            # DirEntry carries the file type from the directory listing, so no extra stat per file
+            with os.scandir(self.input_folder) as entries:
+                all_files = [
+                    entry.path
+                    for entry in entries
+                    if os.path.splitext(entry.name)[1].lower() == pdf_extension and
+                    entry.is_file()
+                ]
         except Exception as e:
             print(f"Error accessing input folder: {e}")
             return
@@ -357,14 +442,39 @@ class NavalDocumentProcessor:
         print(f"Found {len(all_files)} PDF(s) to process")
         print(f"{'='*60}")
         successful_count = 0
-        for pdf_path in all_files:
-            try:
-                self.process_pdf(pdf_path)
-                successful_count += 1
-            except Exception as e:
-                print(f"Error processing {os.path.basename(pdf_path)}: {e}")
-                import traceback
-                traceback.print_exc()
+        merged_paths = []
+        # Extraction and tokenization run in worker processes; merging,
+        # CSV writes and deletes stay here so they remain serialized.
+        max_workers = min(os.cpu_count() or 1, len(all_files), _MAX_WORKERS)
+        self._log_fh = open(self.log_file, 'a', encoding='utf-8', buffering=1 << 16)
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(self.input_folder, self.output_folder)) as executor:
+                futures = [executor.submit(_process_pdf_worker, pdf_path) for pdf_path in all_files]
+                for i, (pdf_path, future) in enumerate(zip(all_files, futures), 1):
+                    try:
+                        if self.merge_pdf_counts(pdf_path, future.result()):
+                            merged_paths.append(pdf_path)
+                        successful_count += 1
+                    except Exception as e:
+                        print(f"Error processing {os.path.basename(pdf_path)}: {e}")
+                        import traceback
+                        traceback.print_exc()
+                    if merged_paths and i % self.checkpoint_every == 0:
+                        try:
+                            self.checkpoint(merged_paths)
+                        except Exception as e:
+                            # merged_paths is kept, so the next checkpoint retries
+                            print(f"✗ Error saving results: {e}")
+            # Nothing merged since the last save: leave the CSVs as they are
+            if merged_paths:
+                try:
+                    self.checkpoint(merged_paths)
+                except Exception as e:
+                    print(f"✗ Error saving results: {e}")
+        finally:
+            self._log_fh.close()
+            self._log_fh = None
         print(f"\n{'='*60}")
         print("PROCESSING COMPLETE")
         print(f"{'='*60}")
@@ -378,6 +488,20 @@ class NavalDocumentProcessor:
         print(f"{'='*60}\n")
 
 
+_worker_processor = None
+
+
+def _init_worker(input_folder, output_folder):
+    """Build one processor per worker process so stopwords load only once."""
+    global _worker_processor
+    _worker_processor = NavalDocumentProcessor(input_folder, output_folder)
+
+
+def _process_pdf_worker(pdf_path):
+    """Count the words of one PDF inside a worker process."""
+    return _worker_processor.process_pdf(pdf_path)
+
+
 # USAGE
 if __name__ == "__main__":
     INPUT_FOLDER = "digitalized_documents"
@@ -1,12 +1,97 @@
 # dict_LIGHTWEIGHT_NO_HEADINGS.py — Schwartz-Hearst with heading removal
 
 import os
-import pandas as pd
+import csv
 import fitz
 import re
 import time
 import stat
-from collections import defaultdict
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from heading_patterns import compile_heading_candidate_re
+
+# ProcessPoolExecutor rejects more than 61 workers on Windows
+_MAX_WORKERS = 61
+
+HEADING_KEYWORDS = frozenset({
+    'chapter', 'section', 'part', 'article', 'annexure',
+    'appendix', 'volume', 'abstract', 'introduction',
+    'conclusion', 'summary', 'references', 'index',
+    'contents', 'session', 'appendices', 'preface',
+    'foreword', 'acknowledgment', 'bibliography'
+})
+
+# Compiled once at import instead of going through re's pattern cache per call.
+# Numbered section, heading keyword prefix (same as lower().startswith) or
+# trailing colon, tested in one match on a stripped line. The keywords are
+# a prefix test, not a whole-word one ("Sections", "Partial" are headings),
+# so they are compiled into the pattern rather than probed by first token.
+_HEADING_RE = re.compile(
+    r'(?:\d+\.(?:\d+)?|[IVXLCDM]+\.)\s+'
+    r'|(?ai:' + '|'.join(sorted(HEADING_KEYWORDS)) + r')'
+    r'|(?s:.*):\Z'
+)
+# Candidate heading lines: uppercase headings run to 12 words and title-case
+# ones to 8, so 12 words bounds both; plus any of the 20 keywords,
+# numbering or a trailing colon
+_HEADING_CANDIDATE_RE = compile_heading_candidate_re(HEADING_KEYWORDS, 12)
+_ACRONYM_RE = re.compile(r'\b[A-Z]{2,10}\b')
+_ACRONYM_VALID_RE = re.compile(r'[A-Z]{2,10}')
+
+# Verb indicators marking a sentence rather than a long form; ASCII
+# case-insensitive, so the same as searching the lowercased text
+_VERB_RE = re.compile(r'(?ai) (?:has|have|is|are|was|were|established|created) ')
+
+# Everything up to and including the last sentence boundary; the greedy
+# .* finds the rightmost marker of any kind in one backward step
+_SENT_RE = re.compile(r'(?s).*[.!?;:]')
+
+# Common false positives
+_FALSE_POSITIVES = frozenset({'NO', 'YES', 'OK', 'AM', 'PM', 'AD', 'BC'})
+
+# Lowercases A-Z (and the Kelvin sign, whose lower() is 'k') one character
+# for one character, so indexes stay valid; str.lower() can change length.
+# These are the only characters whose lower() is an ASCII letter other than itself.
+_ASCII_LOWER = str.maketrans(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ\u212a',
+    'abcdefghijklmnopqrstuvwxyzk'
+)
+
+@lru_cache(maxsize=100_000)
+def _is_heading_line(line):
+    """
+    Heading test behind SchwartzHearstExtractor.is_heading. Module level and
+    cached because running headers and footers repeat on every page.
+    """
+    if not line or len(line.strip()) == 0:
+        return False
+    
+    line = line.strip()
+    
+    # Numbered sections (1., 1.1, I., etc.), lines ending with a colon
+    # and heading keywords, all in one match
+    if _HEADING_RE.match(line):
+        return True
+    
+    # Uppercase (2-12 words) and title case (2-8 words) never need
+    # more than the first 12 words
+    words = line.split(None, 12)
+    if len(words) > 12:
+        return False
+    
+    # 1. All uppercase lines with 2-12 words (typical headings)
+    if len(words) >= 2 and line.isupper():
+        return True
+    
+    # 2. Title case with most words capitalized (70%+)
+    if 2 <= len(words) <= 8:
+        cap_count = sum(1 for w in words if w and len(w) > 0 and w[0].isupper())
+        if cap_count / len(words) >= 0.7:
+            return True
+    
+    return False
+
 
 def safe_delete(file_path, retries=5, delay=1):
     for attempt in range(retries):
@@ -37,8 +122,8 @@ class SchwartzHearstExtractor:
         
         # Storage
         self.acronym_mappings = {}
-        self.acronym_frequencies = defaultdict(int)
-        self.standalone_acronyms = defaultdict(int)
+        self.acronym_frequencies = Counter()
+        self.standalone_acronyms = Counter()
         
         # Output files
         self.mapping_csv = os.path.join(self.output_folder, "acronym_mappings.csv")
@@ -48,77 +133,41 @@ class SchwartzHearstExtractor:
         self.stop_words = {'the', 'a', 'an', 'and', 'or', 'of', 'for', 'in', 'on', 'at', 'to', 'by', 'with'}
         
         # Heading keywords
-        self.heading_keywords = [
-            'chapter', 'section', 'part', 'article', 'annexure', 
-            'appendix', 'volume', 'abstract', 'introduction', 
-            'conclusion', 'summary', 'references', 'index', 
-            'contents', 'session', 'appendices', 'preface',
-            'foreword', 'acknowledgment', 'bibliography'
-        ]
+        self.heading_keywords = HEADING_KEYWORDS
     
     def is_heading(self, line):
         """
         Detect if a line is a heading based on multiple criteria
         """
-        if not line or len(line.strip()) == 0:
-            return False
-        
-        line = line.strip()
-        words = line.split()
-        
-        if len(words) == 0:
-            return False
-        
-        # 1. All uppercase lines with 2-12 words (typical headings)
-        if line.isupper() and 2 <= len(words) <= 12:
-            return True
-        
-        # 2. Lines ending with colon (section headers)
-        if line.endswith(':'):
-            return True
-        
-        # 3. Numbered sections (1., 1.1, I., etc.)
-        if re.match(r'^(\d+\.|\d+\.\d+|[IVXLCDM]+\.)\s+', line):
-            return True
-        
-        # 4. Title case with most words capitalized (70%+)
-        if 2 <= len(words) <= 8:
-            cap_count = sum(1 for w in words if w and len(w) > 0 and w[0].isupper())
-            if cap_count / len(words) >= 0.7:
-                return True
-        
-        # 5. Contains heading keywords
-        line_lower = line.lower()
-        for keyword in self.heading_keywords:
-            if line_lower.startswith(keyword):
-                return True
-        
-        return False
+        return _is_heading_line(line)
     
     def remove_headings_from_text(self, text):
         """
         Remove all heading lines from text before processing
         """
-        lines = text.split('\n')
-        clean_lines = []
-        
         removed_count = 0
-        for line in lines:
-            if not self.is_heading(line):
-                clean_lines.append(line)
-            else:
+        
+        def drop_heading(match):
+            nonlocal removed_count
+            line = match.group()
+            if _is_heading_line(line):
                 removed_count += 1
+                return ''
+            return line
+        
+        text = _HEADING_CANDIDATE_RE.sub(drop_heading, text)
         
         print(f"  Removed {removed_count} heading lines")
-        return '\n'.join(clean_lines)
+        return text
     
     def extract_text_from_pdf(self, pdf_path):
         """Extract text from PDF"""
         try:
             doc = fitz.open(pdf_path)
-            text = ""
-            for page in doc:
-                text += page.get_text("text") + "\n"
+            # Collect pages and join once; a page-less document stays ""
+            get_page_text = doc.get_page_text
+            parts = [get_page_text(pno, "text") for pno in range(doc.page_count)]
+            text = "\n".join(parts) + "\n" if parts else ""
             doc.close()
             return text
         except Exception as e:
@@ -126,24 +175,13 @@ class SchwartzHearstExtractor:
             return ""
     
     def is_valid_acronym(self, text):
-        """Check if text is a valid acronym"""
-        if not text:
-            return False
-        if not text.isupper():
-            return False
-        if len(text) < 2 or len(text) > 10:
+        """Check if text is a valid acronym (2-10 capital letters A-Z)"""
+        if not text or _ACRONYM_VALID_RE.fullmatch(text) is None:
             return False
-        # Must be alphabetic
-        if not text.isalpha():
+        # Exclude single repeated letters and common false positives
+        if len(text) == 2 and text[0] == text[1]:
             return False
-        # Exclude single repeated letters
-        if len(set(text)) == 1 and len(text) <= 2:
-            return False
-        # Exclude common false positives
-        false_positives = ['NO', 'YES', 'OK', 'AM', 'PM', 'AD', 'BC']
-        if text in false_positives:
-            return False
-        return True
+        return text not in _FALSE_POSITIVES
     
     def is_likely_heading_word(self, word):
         """
@@ -189,67 +227,84 @@ class SchwartzHearstExtractor:
         if min_idx is None:
             return None
         
-        # Try to match short form letters to long form
-        sf_index = len(short_form) - 1
+        # Try to match short form letters to long form, right to left;
+        # short forms are ASCII capitals, so an ASCII lowercasing is enough
+        lf_lower = long_form.translate(_ASCII_LOWER)
         lf_index = len(long_form) - 1
         
-        while sf_index >= 0:
-            curr_char = short_form[sf_index].lower()
-            
+        for curr_char in reversed(short_form.translate(_ASCII_LOWER)):
             # Find this character in long form (going backwards)
-            found = False
-            while lf_index >= 0:
-                if long_form[lf_index].lower() == curr_char:
-                    found = True
-                    lf_index -= 1
-                    break
-                lf_index -= 1
-            
-            if not found:
+            lf_index = lf_lower.rfind(curr_char, 0, lf_index + 1)
+            if lf_index < 0:
                 return None
-            
-            sf_index -= 1
+            lf_index -= 1
         
         # Extract the matched portion
         # Find the start of the long form (first capital letter or word boundary)
         start_pos = lf_index + 1
         
-        # Look for word boundary
-        while start_pos > 0 and long_form[start_pos - 1] not in ' \t\n':
-            start_pos -= 1
+        # Look for word boundary: just after the last space, tab or newline
+        start_pos = max(
+            long_form.rfind(' ', 0, start_pos),
+            long_form.rfind('\t', 0, start_pos),
+            long_form.rfind('\n', 0, start_pos)
+        ) + 1
         
         matched_long_form = long_form[start_pos:].strip()
         
         return matched_long_form if len(matched_long_form) > 0 else None
     
-    def extract_candidates_from_parentheses(self, text):
+    def scan_acronyms(self, text):
         """
-        Find all patterns of: text (ACRONYM)
+        Single pass over the text for every acronym token.
+        Returns (candidates, acronym_counts): the (ACRONYM, long form
+        candidate) pairs for patterns of: text (ACRONYM), and the number
+        of occurrences of each acronym token, parenthesized or not.
         """
         candidates = []
-        
-        # Pattern: (UPPERCASE) where UPPERCASE is 2-10 letters
-        pattern = r'([^(]{0,200})\(([A-Z]{2,10})\)'
-        
-        for match in re.finditer(pattern, text):
-            long_form_candidate = match.group(1).strip()
-            short_form = match.group(2).strip()
+        acronym_counts = Counter()
+        valid_short_forms = {}  # is_valid_acronym per distinct short form
+        rfind = text.rfind
+        context_floor = 0
+        
+        for match in _ACRONYM_RE.finditer(text):
+            start, end = match.span()
+            short_form = match.group()
+            acronym_counts[short_form] += 1
             
-            if not self.is_valid_acronym(short_form):
+            # Pattern: (UPPERCASE) where UPPERCASE is 2-10 letters
+            if text[start - 1:start] != '(' or text[end:end + 1] != ')':
                 continue
             
+            # Long form context: up to 200 chars before the parenthesis, not
+            # reaching back past another '(' or into the previous candidate
+            paren = start - 1
+            context_start = max(paren - 200, context_floor, rfind('(', 0, paren) + 1)
+            context_floor = end + 1
+            
+            valid = valid_short_forms.get(short_form)
+            if valid is None:
+                valid = valid_short_forms[short_form] = self.is_valid_acronym(short_form)
+            if not valid:
+                continue
+            
+            long_form_candidate = text[context_start:paren].strip()
+            
             # Clean long form: remove text before last sentence boundary
-            sentence_markers = ['.', '!', '?', ';', ':']
-            for marker in sentence_markers:
-                last_pos = long_form_candidate.rfind(marker)
-                if last_pos != -1:
-                    long_form_candidate = long_form_candidate[last_pos + 1:].strip()
-                    break
+            sentence = _SENT_RE.match(long_form_candidate)
+            if sentence:
+                long_form_candidate = long_form_candidate[sentence.end():].strip()
             
             if long_form_candidate:
                 candidates.append((short_form, long_form_candidate))
         
-        return candidates
+        return candidates, acronym_counts
+    
+    def extract_candidates_from_parentheses(self, text):
+        """
+        Find all patterns of: text (ACRONYM)
+        """
+        return self.scan_acronyms(text)[0]
     
     def clean_long_form(self, long_form):
         """Clean extracted long form"""
@@ -292,11 +347,8 @@ class SchwartzHearstExtractor:
             return False
         
         # Must not be a sentence (no verbs like "has established", "is the")
-        long_form_lower = long_form.lower()
-        verb_indicators = [' has ', ' have ', ' is ', ' are ', ' was ', ' were ', ' established ', ' created ']
-        for indicator in verb_indicators:
-            if indicator in long_form_lower:
-                return False
+        if _VERB_RE.search(long_form):
+            return False
         
         # At least 40% of words should be capitalized
         cap_count = sum(1 for w in words if w and w[0].isupper())
@@ -311,12 +363,11 @@ class SchwartzHearstExtractor:
             matches = 0
             j = 0
             for char in short_form:
-                while j < len(initials):
-                    if initials[j] == char:
-                        matches += 1
-                        j += 1
-                        break
-                    j += 1
+                j = initials.find(char, j)
+                if j < 0:
+                    break
+                matches += 1
+                j += 1
             
             match_ratio = matches / len(short_form) if len(short_form) > 0 else 0
             if match_ratio < 0.3:
@@ -331,8 +382,8 @@ class SchwartzHearstExtractor:
         # IMPORTANT: Remove headings first
         text = self.remove_headings_from_text(text)
         
-        # Find candidates
-        candidates = self.extract_candidates_from_parentheses(text)
+        # Find candidates and count acronym tokens in the same pass
+        candidates, acronym_counts = self.scan_acronyms(text)
         
         print(f"  Found {len(candidates)} candidates")
         
@@ -360,41 +411,39 @@ class SchwartzHearstExtractor:
         
         # Find standalone acronyms (not in mappings)
         # Also filter out acronyms from heading-like contexts
-        all_acronyms = re.findall(r'\b[A-Z]{2,10}\b', text)
-        for acronym in all_acronyms:
-            if self.is_valid_acronym(acronym):
-                if acronym not in self.acronym_mappings:
-                    self.standalone_acronyms[acronym] += 1
+        # Validity is checked once per distinct acronym, not per occurrence
+        self.standalone_acronyms.update({
+            acronym: count
+            for acronym, count in acronym_counts.items()
+            if acronym not in self.acronym_mappings and self.is_valid_acronym(acronym)
+        })
     
     def save_results(self):
         """Save results to CSV"""
+        # Rows end in os.linesep, as pandas' to_csv wrote them
         # Acronym mappings
-        mapping_data = []
-        for acronym in sorted(self.acronym_mappings.keys()):
-            mapping_data.append({
-                'acronym': acronym,
-                'full_form': self.acronym_mappings[acronym],
-                'frequency': self.acronym_frequencies[acronym]
-            })
-        
-        df_mappings = pd.DataFrame(mapping_data)
-        df_mappings.to_csv(self.mapping_csv, index=False)
-        print(f"\n✓ Saved {len(mapping_data)} mappings to {self.mapping_csv}")
+        with open(self.mapping_csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(('acronym', 'full_form', 'frequency'))
+            writer.writerows(
+                (acronym, full_form, self.acronym_frequencies[acronym])
+                for acronym, full_form in sorted(self.acronym_mappings.items())
+            )
+        print(f"\n✓ Saved {len(self.acronym_mappings)} mappings to {self.mapping_csv}")
         
         # Standalone acronyms
-        standalone_data = []
-        for acronym in sorted(self.standalone_acronyms.keys()):
-            standalone_data.append({
-                'acronym': acronym,
-                'frequency': self.standalone_acronyms[acronym]
-            })
-        
-        df_standalone = pd.DataFrame(standalone_data)
-        df_standalone.to_csv(self.standalone_csv, index=False)
-        print(f"✓ Saved {len(standalone_data)} standalone acronyms to {self.standalone_csv}")
+        with open(self.standalone_csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(('acronym', 'frequency'))
+            writer.writerows(sorted(self.standalone_acronyms.items()))
+        print(f"✓ Saved {len(self.standalone_acronyms)} standalone acronyms to {self.standalone_csv}")
     
     def process_pdf(self, pdf_path):
-        """Process a single PDF"""
+        """
+        Extract acronyms from a single PDF into this extractor's storage.
+        Saving and deleting are left to the caller.
+        Returns False if no text was extracted.
+        """
         pdf_name = os.path.basename(pdf_path)
         print(f"\n{'='*60}")
         print(f"Processing: {pdf_name}")
@@ -405,37 +454,51 @@ class SchwartzHearstExtractor:
         
         if not text:
             print("No text extracted!")
-            return
+            return False
         
         print(f"Extracted {len(text)} characters")
         
         # Extract acronyms (headings removed inside)
         self.extract_acronyms(text)
+        return True
+    
+    def merge_pdf_results(self, pdf_path, results):
+        """
+        Merge one PDF's results into the totals, in the same way as if it had
+        been processed here: first mapping wins, frequencies add up, and
+        standalone acronyms only count while they have no mapping.
+        Returns True if the PDF was merged and can be deleted once saved.
+        """
+        if results is None:
+            return False
         
-        # Save results
-        self.save_results()
+        mappings, frequencies, standalone = results
+        for short_form, long_form in mappings.items():
+            self.acronym_mappings.setdefault(short_form, long_form)
+        self.acronym_frequencies.update(frequencies)
+        for acronym, count in standalone.items():
+            if acronym not in self.acronym_mappings:
+                self.standalone_acronyms[acronym] += count
         
+        pdf_name = os.path.basename(pdf_path)
         print(f"\n{'='*60}")
         print(f"Results for {pdf_name}")
         print(f"{'='*60}")
         print(f"Acronym mappings: {len(self.acronym_mappings)}")
         print(f"Standalone acronyms: {len(self.standalone_acronyms)}")
         print(f"{'='*60}\n")
-        
-        # Delete PDF
-        try:
-            safe_delete(pdf_path)
-        except:
-            pass
+        return True
     
     def process_all_pdfs(self):
         """Process all PDFs in folder"""
         try:
-            pdf_files = [
-                os.path.join(self.input_folder, f)
-                for f in os.listdir(self.input_folder)
-                if f.lower().endswith('.pdf')
-            ]
+            # DirEntry carries the name, path and file type from the listing
+            with os.scandir(self.input_folder) as entries:
+                pdf_files = [
+                    entry.path
+                    for entry in entries
+                    if entry.name.lower().endswith('.pdf') and entry.is_file()
+                ]
         except Exception as e:
             print(f"Error reading folder: {e}")
             return
@@ -452,13 +515,32 @@ class SchwartzHearstExtractor:
         print(f"Output folder: {self.output_folder}")
         print(f"{'='*60}")
         
-        for pdf_path in pdf_files:
-            try:
-                self.process_pdf(pdf_path)
-            except Exception as e:
-                print(f"Error processing {os.path.basename(pdf_path)}: {e}")
-                import traceback
-                traceback.print_exc()
+        # Each PDF is extracted by a fresh extractor in a worker process;
+        # results are merged here in file order, saved once, and only then
+        # are the merged PDFs deleted.
+        merged_paths = []
+        max_workers = min(os.cpu_count() or 1, len(pdf_files), _MAX_WORKERS)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_process_pdf_worker, self.input_folder, self.output_folder, pdf_path)
+                for pdf_path in pdf_files
+            ]
+            for pdf_path, future in zip(pdf_files, futures):
+                try:
+                    if self.merge_pdf_results(pdf_path, future.result()):
+                        merged_paths.append(pdf_path)
+                except Exception as e:
+                    print(f"Error processing {os.path.basename(pdf_path)}: {e}")
+                    import traceback
+                    traceback.print_exc()
+        
+        if merged_paths:
+            self.save_results()
+            for pdf_path in merged_paths:
+                try:
+                    safe_delete(pdf_path)
+                except:
+                    pass
         
         print(f"\n{'='*60}")
         print("PROCESSING COMPLETE")
@@ -468,6 +550,18 @@ class SchwartzHearstExtractor:
         print(f"{'='*60}\n")
 
 
+def _process_pdf_worker(input_folder, output_folder, pdf_path):
+    """Extract one PDF in a worker process with its own extractor."""
+    extractor = SchwartzHearstExtractor(input_folder, output_folder)
+    if not extractor.process_pdf(pdf_path):
+        return None
+    return (
+        extractor.acronym_mappings,
+        extractor.acronym_frequencies,
+        extractor.standalone_acronyms
+    )
+
+
 if __name__ == "__main__":
     INPUT_FOLDER = "digitalized_documents"
     OUTPUT_FOLDER = "output_lightweight"
@@ -0,0 +1,20 @@
+# heading_patterns.py — regex shared by the heading-removal passes
+
+import re
+
+
+def compile_heading_candidate_re(keywords, max_words):
+    """
+    Multiline pattern for lines that could be headings: at most max_words
+    words, a keyword (plain ASCII case-insensitive prefix), digit or
+    Roman-numeral start, or a trailing colon. The match includes the
+    line's newline, so replacing it with '' removes the line.
+    """
+    return re.compile(
+        r'^[^\S\n]*(?:'
+        r'\S+(?:[^\S\n]+\S+){0,%d}[^\S\n]*' % (max_words - 1) +
+        r'|(?:(?ai:' + '|'.join(sorted(keywords)) + r')|\d|[IVXLCDM]).*'
+        r'|.*:[^\S\n]*'
+        r')$\n?',
+        re.MULTILINE
+    )